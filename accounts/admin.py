@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import F
 from accounts.models import FriendRequest, User
+from accounts.views import update_friend_counts
 
 
 # Register your models here.
@@ -11,6 +14,7 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ("id", "user_name", "email")
     list_per_page = 10
     exclude = ("password",)
+    readonly_fields = ("friends_count", "pending_requests_count")
 
 
 class FriendRequestAdmin(admin.ModelAdmin):
@@ -18,6 +22,47 @@ class FriendRequestAdmin(admin.ModelAdmin):
     search_fields = ("id", "sender", "receiver", "status")
     list_per_page = 10
 
+    def get_readonly_fields(self, request, obj=None):
+        # Moving an existing request to other users would bypass the counters.
+        if obj:
+            return ("sender", "receiver")
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        """
+        Save the friend request and apply its status change to the users' counters. A new request is
+        counted as sent and then moved from "PENDING" to its chosen status.
+        """
+        with transaction.atomic():
+            if change:
+                previous_status = (
+                    FriendRequest.objects.select_for_update().get(pk=obj.pk).status
+                )
+            else:
+                previous_status = "PENDING"
+
+            super().save_model(request, obj, form, change)
+            if not change:
+                User.objects.filter(id=obj.receiver_id).update(
+                    pending_requests_count=F("pending_requests_count") + 1
+                )
+            update_friend_counts(obj, previous_status)
+
+    def delete_model(self, request, obj):
+        """
+        Delete the friend request and take it out of the users' counters, as if it had been rejected.
+        """
+        with transaction.atomic():
+            previous_status = obj.status
+            super().delete_model(request, obj)
+            obj.status = "REJECTED"
+            update_friend_counts(obj, previous_status)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for obj in queryset.select_for_update():
+                self.delete_model(request, obj)
+
 
 admin.site.register(User, UserAdmin)
 admin.site.register(FriendRequest, FriendRequestAdmin)
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.core.management.base import BaseCommand
+from accounts.models import FriendRequest, User
+
+
+def count_by(queryset, field_name):
+    """
+    Return a {user_id: count} dict of the rows in `queryset` grouped by `field_name`.
+    """
+    return dict(
+        queryset.values(field_name)
+        .annotate(total=Count("id"))
+        .values_list(field_name, "total")
+    )
+
+
+# The `Command` class recomputes the denormalized friend and pending request counters of every
+# user from the FriendRequest table.
+class Command(BaseCommand):
+    help = "Recompute friends_count and pending_requests_count for all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users locked, recomputed and written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Rebuild the counters in bulk, walking users in ID order one batch at a time so memory use
+        and lock scope stay bounded by `--batch-size`.
+        """
+        batch_size = options["batch_size"]
+        last_id = 0
+        reconciled = 0
+
+        while True:
+            with transaction.atomic():
+                users = list(
+                    User.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .only("id", "friends_count", "pending_requests_count")
+                    .order_by("id")[:batch_size]
+                )
+                if not users:
+                    break
+                reconciled += self.reconcile(users)
+            last_id = users[-1].id
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled counters for {reconciled} user(s).")
+        )
+
+    def reconcile(self, users):
+        """
+        Recompute the counters of the given, already locked, users and write back the stale ones.
+
+        The users are locked before their totals are read, so a friend request write that lands
+        meanwhile waits for this transaction and applies its F() update on top of the reconciled value
+        instead of being overwritten. Friends are counted as accepted requests sent plus received,
+        minus the sent ones whose reverse is also accepted, so a mutual pair counts once, matching
+        ListFriendsView. Pending requests are counted per receiver, matching
+        ListPendingFriendRequestsView.
+        """
+        ids = [user.id for user in users]
+        accepted = FriendRequest.objects.filter(status="ACCEPTED")
+        sent = count_by(accepted.filter(sender_id__in=ids), "sender_id")
+        received = count_by(accepted.filter(receiver_id__in=ids), "receiver_id")
+        mutual = count_by(
+            accepted.filter(
+                Exists(
+                    FriendRequest.objects.filter(
+                        sender_id=OuterRef("receiver_id"),
+                        receiver_id=OuterRef("sender_id"),
+                        status="ACCEPTED",
+                    )
+                ),
+                sender_id__in=ids,
+            ),
+            "sender_id",
+        )
+        pending = count_by(
+            FriendRequest.objects.filter(status="PENDING", receiver_id__in=ids),
+            "receiver_id",
+        )
+
+        stale_users = []
+        for user in users:
+            friends_count = (
+                sent.get(user.id, 0)
+                + received.get(user.id, 0)
+                - mutual.get(user.id, 0)
+            )
+            pending_requests_count = pending.get(user.id, 0)
+            if (
+                user.friends_count != friends_count
+                or user.pending_requests_count != pending_requests_count
+            ):
+                user.friends_count = friends_count
+                user.pending_requests_count = pending_requests_count
+                stale_users.append(user)
+
+        User.objects.bulk_update(
+            stale_users, ["friends_count", "pending_requests_count"]
+        )
+        return len(stale_users)
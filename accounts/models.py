@@ -51,6 +51,13 @@ class User(AbstractBaseUser):
     is_active = models.BooleanField(_("active"), default=True)
     is_staff = models.BooleanField(_("staff"), default=False)
     is_superuser = models.BooleanField(_("staff"), default=False)
+    # Denormalized counters, kept in step with FriendRequest writes in the views and the admin,
+    # and recomputable with `python manage.py reconcile_friend_counts`. Requests removed by
+    # deleting a user (cascade) or written outside those paths need a reconcile run.
+    friends_count = models.PositiveIntegerField(_("friends count"), default=0)
+    pending_requests_count = models.PositiveIntegerField(
+        _("pending requests count"), default=0
+    )
 
     objects = UserManager()
     USERNAME_FIELD = "email"
@@ -24,6 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = "__all__"
+        read_only_fields = ["friends_count", "pending_requests_count"]
 
     def create(self, validated_data):
         user = User.objects.create(
@@ -35,18 +36,41 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+# The `DynamicFieldsModelSerializer` class takes an optional `fields` argument that restricts the
+# serialized output to the given subset of its declared fields.
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
 # The `UserSearchSerializer` class is a Django REST framework serializer for the User model with
 # fields for id, user_name, and email.
-class UserSearchSerializer(serializers.ModelSerializer):
+class UserSearchSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = User
         fields = ["id", "user_name", "email"]
 
 
 # The `FriendRequestSerializer` class defines a serializer for the `FriendRequest` model with
-# specified fields and read-only fields.
-class FriendRequestSerializer(serializers.ModelSerializer):
+# specified fields and read-only fields. Fields listed in `expand` are rendered as nested users
+# instead of raw IDs.
+class FriendRequestSerializer(DynamicFieldsModelSerializer):
+    EXPANDABLE_FIELDS = ["sender", "receiver"]
+
     class Meta:
         model = FriendRequest
         fields = ["id", "sender", "receiver", "status", "created_at"]
         read_only_fields = ["sender", "status", "created_at"]
+
+    def __init__(self, *args, **kwargs):
+        expand = kwargs.pop("expand", ())
+        super().__init__(*args, **kwargs)
+
+        for field_name in expand:
+            if field_name in self.fields:
+                self.fields[field_name] = UserSearchSerializer(read_only=True)
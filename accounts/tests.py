@@ -1,3 +1,262 @@
+from io import StringIO
+from django.db import connection
 from django.test import TestCase
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from accounts.models import FriendRequest, User
 
-# Create your tests here.
+
+# The `FriendCountsTestCase` class covers the denormalized friend and pending request counters kept
+# in step by the friend request views and the `reconcile_friend_counts` command.
+class FriendCountsTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@example.com", "password")
+        self.bob = User.objects.create_user("bob@example.com", "password")
+
+    def authenticate(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def send(self, sender, receiver):
+        self.authenticate(sender)
+        response = self.client.post(f"/api/user/send-friend-request/{receiver.id}/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return FriendRequest.objects.get(sender=sender, receiver=receiver)
+
+    def update(self, friend_request, action):
+        self.authenticate(friend_request.receiver)
+        response = self.client.post(
+            f"/api/user/update-friend-request/{friend_request.id}/{action}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def assertCounts(self, user, friends, pending_requests):
+        user.refresh_from_db()
+        self.assertEqual(user.friends_count, friends)
+        self.assertEqual(user.pending_requests_count, pending_requests)
+
+    def test_send_increments_receiver_pending_count(self):
+        self.send(self.alice, self.bob)
+        self.assertCounts(self.alice, 0, 0)
+        self.assertCounts(self.bob, 0, 1)
+
+    def test_accept_decrements_pending_and_increments_friends(self):
+        self.update(self.send(self.alice, self.bob), "accept")
+        self.assertCounts(self.alice, 1, 0)
+        self.assertCounts(self.bob, 1, 0)
+
+    def test_reject_decrements_pending(self):
+        self.update(self.send(self.alice, self.bob), "reject")
+        self.assertCounts(self.alice, 0, 0)
+        self.assertCounts(self.bob, 0, 0)
+
+    def test_accept_after_reject_increments_friends_only(self):
+        friend_request = self.send(self.alice, self.bob)
+        self.update(friend_request, "reject")
+        self.update(friend_request, "accept")
+        self.assertCounts(self.alice, 1, 0)
+        self.assertCounts(self.bob, 1, 0)
+
+    def test_accept_with_reverse_accepted_does_not_double_count(self):
+        self.update(self.send(self.alice, self.bob), "accept")
+        self.update(self.send(self.bob, self.alice), "accept")
+        self.assertCounts(self.alice, 1, 0)
+        self.assertCounts(self.bob, 1, 0)
+
+    def test_accept_self_request_counts_once(self):
+        self.update(self.send(self.alice, self.alice), "accept")
+        self.assertCounts(self.alice, 1, 0)
+
+        call_command("reconcile_friend_counts", stdout=StringIO())
+        self.assertCounts(self.alice, 1, 0)
+
+    def test_reject_one_side_of_mutual_pair_keeps_friends(self):
+        forward = self.send(self.alice, self.bob)
+        self.update(forward, "accept")
+        self.update(self.send(self.bob, self.alice), "accept")
+        self.update(forward, "reject")
+        self.assertCounts(self.alice, 1, 0)
+        self.assertCounts(self.bob, 1, 0)
+
+    def test_counts_endpoint(self):
+        self.send(self.alice, self.bob)
+        self.authenticate(self.bob)
+        response = self.client.get("/api/user/counts/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"friends": 0, "pending_requests": 1})
+
+    def test_reconcile_fixes_wrong_counters(self):
+        carol = User.objects.create_user("carol@example.com", "password")
+        FriendRequest.objects.create(
+            sender=self.alice, receiver=self.bob, status="ACCEPTED"
+        )
+        FriendRequest.objects.create(
+            sender=self.bob, receiver=self.alice, status="ACCEPTED"
+        )
+        FriendRequest.objects.create(sender=carol, receiver=self.alice)
+        User.objects.update(friends_count=5, pending_requests_count=7)
+
+        call_command("reconcile_friend_counts", "--batch-size=1", stdout=StringIO())
+
+        self.assertCounts(self.alice, 1, 1)
+        self.assertCounts(self.bob, 1, 0)
+        self.assertCounts(carol, 0, 0)
+
+
+# The `FriendRequestAdminTestCase` class covers friend request edits made through the admin, which
+# must keep the denormalized counters in step like the views do.
+class FriendRequestAdminTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@example.com", "password")
+        self.bob = User.objects.create_user("bob@example.com", "password")
+        admin_user = User.objects.create_superuser("admin@example.com", "password")
+        self.client.force_login(admin_user)
+
+    def assertCounts(self, user, friends, pending_requests):
+        user.refresh_from_db()
+        self.assertEqual(user.friends_count, friends)
+        self.assertEqual(user.pending_requests_count, pending_requests)
+
+    def test_add_change_and_delete_update_counters(self):
+        response = self.client.post(
+            "/admin/accounts/friendrequest/add/",
+            {"sender": self.alice.id, "receiver": self.bob.id, "status": "PENDING"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertCounts(self.bob, 0, 1)
+
+        friend_request = FriendRequest.objects.get()
+        response = self.client.post(
+            f"/admin/accounts/friendrequest/{friend_request.id}/change/",
+            {"status": "ACCEPTED"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertCounts(self.alice, 1, 0)
+        self.assertCounts(self.bob, 1, 0)
+
+        response = self.client.post(
+            f"/admin/accounts/friendrequest/{friend_request.id}/delete/",
+            {"post": "yes"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(FriendRequest.objects.exists())
+        self.assertCounts(self.alice, 0, 0)
+        self.assertCounts(self.bob, 0, 0)
+
+    def test_user_counters_are_read_only(self):
+        self.alice.friends_count = 3
+        self.alice.save()
+        response = self.client.post(
+            f"/admin/accounts/user/{self.alice.id}/change/",
+            {
+                "email": "alice@example.com",
+                "is_active": "on",
+                "friends_count": 9,
+                "pending_requests_count": 9,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertCounts(self.alice, 3, 0)
+
+
+# The `SparseFieldsTestCase` class covers the batch user lookup and the `fields`/`expand` options of
+# the friend list endpoints.
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@example.com", "password")
+        self.bob = User.objects.create_user("bob@example.com", "password")
+        self.carol = User.objects.create_user("carol@example.com", "password")
+        token, _ = Token.objects.get_or_create(user=self.alice)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_batch_users(self):
+        response = self.client.get(
+            f"/api/user/users/?ids={self.carol.id},{self.bob.id},{self.bob.id}"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [user["email"] for user in response.data],
+            ["bob@example.com", "carol@example.com"],
+        )
+        self.assertEqual(set(response.data[0]), {"id", "user_name", "email"})
+
+    def test_batch_users_with_fields(self):
+        response = self.client.get(f"/api/user/users/?ids={self.bob.id}&fields=email")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{"email": "bob@example.com"}])
+
+    def test_batch_users_invalid_requests(self):
+        too_many = ",".join(str(user_id) for user_id in range(1, 102))
+        for query in [
+            "",
+            "?ids=",
+            "?ids=1,abc",
+            "?ids=0",
+            "?ids=99999999999999999999999",
+            f"?ids={too_many}",
+            f"?ids={self.bob.id}&fields=is_staff",
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/user/users/{query}")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("error", response.data)
+
+    def test_list_friends_hides_private_fields(self):
+        FriendRequest.objects.create(
+            sender=self.bob, receiver=self.alice, status="ACCEPTED"
+        )
+        response = self.client.get("/api/user/list-friends/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(set(response.data[0]), {"id", "user_name", "email"})
+
+        response = self.client.get("/api/user/list-friends/?fields=id")
+        self.assertEqual(response.data, [{"id": self.bob.id}])
+
+    def test_list_pending_requests_with_fields(self):
+        friend_request = FriendRequest.objects.create(
+            sender=self.bob, receiver=self.alice
+        )
+        response = self.client.get("/api/user/list-pending-requests/?fields=id,sender")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, [{"id": friend_request.id, "sender": self.bob.id}]
+        )
+
+        response = self.client.get("/api/user/list-pending-requests/?fields=password")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get("/api/user/list-pending-requests/?expand=status")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_pending_requests_expand_uses_single_join(self):
+        FriendRequest.objects.create(sender=self.bob, receiver=self.alice)
+        FriendRequest.objects.create(sender=self.carol, receiver=self.alice)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                "/api/user/list-pending-requests/?expand=sender,receiver"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {request["sender"]["email"] for request in response.data},
+            {"bob@example.com", "carol@example.com"},
+        )
+        self.assertEqual(
+            response.data[0]["receiver"],
+            {"id": self.alice.id, "user_name": None, "email": "alice@example.com"},
+        )
+        friend_request_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "accounts_friendrequest" in query["sql"]
+        ]
+        self.assertEqual(len(friend_request_queries), 1)
+        # One query authenticates the token, the other fetches requests joined with both users.
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertIn("JOIN", friend_request_queries[0])
+        self.assertNotIn("password", friend_request_queries[0])
@@ -1,9 +1,11 @@
 from django.urls import path
 from accounts.views import (
+    FriendCountsView,
     ListFriendsView,
     ListPendingFriendRequestsView,
     SendFriendRequestView,
     UpdateFriendRequestView,
+    UserBatchView,
     UserLoginView,
     UserSearchView,
     UserSignupView,
@@ -13,6 +15,7 @@ urlpatterns = [
     path("signup", UserSignupView.as_view()),
     path("login", UserLoginView.as_view()),
     path("search-users/", UserSearchView.as_view(), name="search_users"),
+    path("users/", UserBatchView.as_view(), name="batch_users"),
     path("send-friend-request/<int:receiver_id>/", SendFriendRequestView.as_view()),
     path(
         "update-friend-request/<int:request_id>/<str:action>/",
@@ -20,4 +23,5 @@ urlpatterns = [
     ),
     path("list-friends/", ListFriendsView.as_view()),
     path("list-pending-requests/", ListPendingFriendRequestsView.as_view()),
+    path("counts/", FriendCountsView.as_view()),
 ]
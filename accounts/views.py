@@ -1,5 +1,6 @@
 from datetime import timedelta
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.views import APIView
@@ -17,6 +18,74 @@ from accounts.serializer import (
 )
 
 
+def get_query_list(request, param):
+    """
+    Split a comma separated query parameter, e.g. `?fields=id,email`, into a list of values.
+    """
+    return [
+        value.strip()
+        for value in request.query_params.get(param, "").split(",")
+        if value.strip()
+    ]
+
+
+def invalid_choices_response(param, values, allowed):
+    """
+    Return a 400 Bad Request response naming the values not in `allowed`, or None if all are valid.
+    """
+    invalid = [value for value in values if value not in allowed]
+    if invalid:
+        return Response(
+            {"error": f"Invalid {param}: {', '.join(invalid)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def update_friend_counts(friend_request, previous_status):
+    """
+    Apply a friend request status transition to the denormalized counters on User.
+
+    Must run in the same transaction as the FriendRequest write. The receiver's pending counter
+    drops once the request leaves "PENDING"; both users' friend counters move when the request
+    enters or leaves "ACCEPTED", unless a reverse accepted request already makes them friends.
+    Both user rows are locked in ID order first, so concurrent status changes for the same pair
+    of users, in either direction, are serialized and see each other's writes.
+    Decrements never go below zero; `reconcile_friend_counts` repairs any drift.
+    """
+    if previous_status == friend_request.status:
+        return
+
+    pair = [friend_request.sender_id, friend_request.receiver_id]
+    list(User.objects.select_for_update().filter(id__in=pair).order_by("id"))
+
+    if previous_status == "PENDING":
+        User.objects.filter(
+            id=friend_request.receiver_id, pending_requests_count__gt=0
+        ).update(pending_requests_count=F("pending_requests_count") - 1)
+
+    if "ACCEPTED" not in (previous_status, friend_request.status):
+        return
+
+    # A self request is its own reverse, so it is excluded from the lookup.
+    if (
+        FriendRequest.objects.filter(
+            sender_id=friend_request.receiver_id,
+            receiver_id=friend_request.sender_id,
+            status="ACCEPTED",
+        )
+        .exclude(pk=friend_request.pk)
+        .exists()
+    ):
+        return
+
+    users = User.objects.filter(id__in=pair)
+    if friend_request.status == "ACCEPTED":
+        users.update(friends_count=F("friends_count") + 1)
+    else:
+        users.filter(friends_count__gt=0).update(friends_count=F("friends_count") - 1)
+
+
 # Create your views here.
 class UserSignupView(APIView):
     def post(self, request, *args, **kwargs):
@@ -121,6 +190,66 @@ class UserSearchView(APIView, PageNumberPagination):
         return self.get_paginated_response(serializer.data)
 
 
+class UserBatchView(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    max_ids = 100
+    # Range of the BigAutoField primary key; larger values overflow the database integer type.
+    max_id_value = 2**63 - 1
+
+    def get(self, request):
+        """
+        Handle GET request for looking up several users at once.
+
+        Fetches the users whose IDs are given as a comma separated `ids` query parameter with a single
+        query, so clients can resolve the sender and receiver IDs of friend requests in one round trip.
+        An optional `fields` query parameter restricts the returned columns.
+
+        Parameters:
+        - request: HttpRequest object containing the `ids` and optional `fields` query parameters.
+
+        Returns:
+        - Response object with a serialized list of the users found, ordered by ID.
+        - Response object with status code 400 Bad Request if the IDs are missing, malformed, out of
+          the primary key range or more than `max_ids`, or if an unknown field is requested.
+        """
+        try:
+            ids = {int(value) for value in get_query_list(request, "ids")}
+            if any(not 0 < user_id <= self.max_id_value for user_id in ids):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma separated list of integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ids:
+            return Response(
+                {"error": "At least one user id is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > self.max_ids:
+            return Response(
+                {"error": f"At most {self.max_ids} user ids can be requested."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fields = get_query_list(request, "fields")
+        error_response = invalid_choices_response(
+            "fields", fields, UserSearchSerializer.Meta.fields
+        )
+        if error_response:
+            return error_response
+
+        users = (
+            User.objects.filter(id__in=ids)
+            .only(*(fields or UserSearchSerializer.Meta.fields))
+            .order_by("id")
+        )
+        serializer = UserSearchSerializer(users, many=True, fields=fields)
+        return Response(serializer.data)
+
+
 class SendFriendRequestView(APIView):
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
@@ -159,7 +288,11 @@ class SendFriendRequestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        FriendRequest.objects.create(sender=request.user, receiver_id=receiver_id)
+        with transaction.atomic():
+            FriendRequest.objects.create(sender=request.user, receiver_id=receiver_id)
+            User.objects.filter(id=receiver_id).update(
+                pending_requests_count=F("pending_requests_count") + 1
+            )
         return Response(
             {"success": "Friend request sent"}, status=status.HTTP_201_CREATED
         )
@@ -188,19 +321,23 @@ class UpdateFriendRequestView(APIView):
         - Response object with status code 404 Not Found if the friend request is not found.
         """
         try:
-            friend_request = FriendRequest.objects.get(
-                id=request_id, receiver=request.user
-            )
-            if action == "accept":
-                friend_request.status = "ACCEPTED"
-            elif action == "reject":
-                friend_request.status = "REJECTED"
-            else:
-                return Response(
-                    {"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST
+            with transaction.atomic():
+                friend_request = FriendRequest.objects.select_for_update().get(
+                    id=request_id, receiver=request.user
                 )
-
-            friend_request.save()
+                previous_status = friend_request.status
+                if action == "accept":
+                    friend_request.status = "ACCEPTED"
+                elif action == "reject":
+                    friend_request.status = "REJECTED"
+                else:
+                    return Response(
+                        {"error": "Invalid action"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+                friend_request.save()
+                update_friend_counts(friend_request, previous_status)
             return Response(
                 {"success": f"Friend request {action}ed."}, status=status.HTTP_200_OK
             )
@@ -221,6 +358,7 @@ class ListFriendsView(APIView):
         Retrieves a list of users who have mutually accepted friend requests with the authenticated user.
         This list includes users who have either sent a friend request to the authenticated user and had it accepted,
         or users to whom the authenticated user has sent a friend request that was accepted.
+        Only public user fields are returned; an optional `fields` query parameter narrows them further.
 
         Authentication Classes:
         - TokenAuthentication: Ensures users are authenticated via token authentication to access their list of friends.
@@ -228,14 +366,28 @@ class ListFriendsView(APIView):
         Permission Classes:
         - IsAuthenticated: Restricts access to authenticated users, ensuring privacy and security of user data.
         """
-        friends = User.objects.filter(
-            Q(
-                received_requests__sender=request.user,
-                received_requests__status="ACCEPTED",
+        fields = get_query_list(request, "fields")
+        error_response = invalid_choices_response(
+            "fields", fields, UserSearchSerializer.Meta.fields
+        )
+        if error_response:
+            return error_response
+
+        friends = (
+            User.objects.filter(
+                Q(
+                    received_requests__sender=request.user,
+                    received_requests__status="ACCEPTED",
+                )
+                | Q(
+                    sent_requests__receiver=request.user,
+                    sent_requests__status="ACCEPTED",
+                )
             )
-            | Q(sent_requests__receiver=request.user, sent_requests__status="ACCEPTED")
-        ).distinct()
-        serializer = UserSerializer(friends, many=True)
+            .distinct()
+            .only(*(fields or UserSearchSerializer.Meta.fields))
+        )
+        serializer = UserSearchSerializer(friends, many=True, fields=fields)
         return Response(serializer.data)
 
 
@@ -249,15 +401,69 @@ class ListPendingFriendRequestsView(APIView):
 
         Queries the FriendRequest model for all instances where the authenticated user is the receiver and the
         status is "PENDING". Serializes the query results to provide a clear representation of each pending friend request.
+        An optional `fields` query parameter restricts the returned columns, and `expand=sender,receiver` renders
+        those users inline, fetched in the same query, instead of as raw IDs.
 
         Parameters:
-        - request: HttpRequest object containing the authenticated user's data.
+        - request: HttpRequest object containing the authenticated user's data and optional `fields`/`expand`
+          query parameters.
 
         Returns:
         - Response object with a serialized list of pending friend requests directed to the authenticated user.
+        - Response object with status code 400 Bad Request if an unknown field or expansion is requested.
         """
+        fields = get_query_list(request, "fields")
+        expand = get_query_list(request, "expand")
+        error_response = invalid_choices_response(
+            "fields", fields, FriendRequestSerializer.Meta.fields
+        ) or invalid_choices_response(
+            "expand", expand, FriendRequestSerializer.EXPANDABLE_FIELDS
+        )
+        if error_response:
+            return error_response
+
+        columns = fields or FriendRequestSerializer.Meta.fields
+        expand = [field_name for field_name in expand if field_name in columns]
+
         pending_requests = FriendRequest.objects.filter(
             receiver=request.user, status="PENDING"
         )
-        serializer = FriendRequestSerializer(pending_requests, many=True)
+        if expand:
+            pending_requests = pending_requests.select_related(*expand)
+        pending_requests = pending_requests.only(
+            *columns,
+            *(
+                f"{field_name}__{user_field}"
+                for field_name in expand
+                for user_field in UserSearchSerializer.Meta.fields
+            ),
+        )
+        serializer = FriendRequestSerializer(
+            pending_requests, many=True, fields=fields, expand=expand
+        )
         return Response(serializer.data)
+
+
+class FriendCountsView(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """
+        Handle GET request for the authenticated user's friend and pending request counts.
+
+        Reads the denormalized counters already loaded with the authenticated user, so badge refreshes
+        do not need to fetch and count the list-friends or list-pending-requests payloads.
+
+        Parameters:
+        - request: HttpRequest object containing the authenticated user's data.
+
+        Returns:
+        - Response object with the number of friends and pending friend requests of the authenticated user.
+        """
+        return Response(
+            {
+                "friends": request.user.friends_count,
+                "pending_requests": request.user.pending_requests_count,
+            }
+        )